@@ -1,6 +1,5 @@
 import sys
 import os
-import textwrap
 from dotenv import load_dotenv
 from types import SimpleNamespace
 
@@ -14,16 +13,13 @@ if os.path.exists(libdir):
     sys.path.append(libdir)
 
 import requests
-import json
 from datetime import datetime
 
 # from waveshare_epd import epd7in5_V2
-import time
 from PIL import Image, ImageDraw, ImageFont
-import traceback
 import logging
 
-API_URL = int(os.getenv("API_URL", ""))
+API_URL = os.getenv("API_URL", "")
 
 logging.basicConfig(level=logging.DEBUG)
 
@@ -109,13 +105,14 @@ def display_bus_arrivals_simulated(epd, draw, bus_info, Himage):
     print("Simulated display saved as 'bus_arrivals_simulated.png'")
 
 
-# 800 x 480
-epd = SimpleNamespace(width=800, height=480)
-api_key = os.getenv("API_KEY")
-bus_stop_code_A = os.getenv("BUS_STOP_CODE_A")
-bus_info_A = get_bus_arrival(api_key, bus_stop_code_A)
-# print(bus_info_A)
-Himage = Image.new("1", (epd.width, epd.height), 255)
-draw = ImageDraw.Draw(Himage)
+if __name__ == "__main__":
+    # 800 x 480
+    epd = SimpleNamespace(width=800, height=480)
+    api_key = os.getenv("API_KEY")
+    bus_stop_code_A = os.getenv("BUS_STOP_CODE_A")
+    bus_info_A = get_bus_arrival(api_key, bus_stop_code_A)
+    # print(bus_info_A)
+    Himage = Image.new("1", (epd.width, epd.height), 255)
+    draw = ImageDraw.Draw(Himage)
 
-display_bus_arrivals_simulated(epd, draw, bus_info_A, Himage)
+    display_bus_arrivals_simulated(epd, draw, bus_info_A, Himage)
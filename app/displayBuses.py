@@ -3,9 +3,10 @@ import logging
 import math
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from functools import lru_cache
-from typing import List, Optional, Tuple, TypedDict
+from typing import Dict, List, Optional, Tuple, TypedDict
 from zoneinfo import ZoneInfo
 
 import requests
@@ -83,6 +84,13 @@ def _load_font_mono(libdir: str, size: int) -> ImageFont.FreeTypeFont:
     return _load_font_cached(libdir, size, bold=False, mono=True)
 
 
+# Fonts used on every bus render, resolved once at import
+_TITLE_FONT = _load_font(FONT_DIR, 22)
+_BADGE_FONT = _load_font_bold(FONT_DIR, 24)
+_ETA_BIG = _load_font_bold(FONT_DIR, 32)
+_ETA_SMALL = _load_font_mono(FONT_DIR, 24)
+
+
 # ---------- formatting helpers ----------
 def _fmt_eta(v: Optional[int]) -> str:
     if v is None:
@@ -93,15 +101,6 @@ def _fmt_eta(v: Optional[int]) -> str:
     return f"{v} {unit}"
 
 
-def _clamp_minutes_floor(delta_minutes: Optional[float]) -> Optional[int]:
-    if delta_minutes is None:
-        return None
-    try:
-        return max(0, math.floor(delta_minutes))
-    except Exception:
-        return None
-
-
 def fmt_all_etas(etas: List[Optional[int]]) -> Tuple[str, str, str]:
     """Return (l1, l2, l3) strings with zero-padding applied to l2/l3 only."""
     v1 = etas[0] if len(etas) > 0 else None
@@ -135,57 +134,77 @@ def draw_centered_text(draw: ImageDraw.ImageDraw, cx: int, cy: int, text: str, f
 
 
 # ---------- drawing ----------
-def render_stop_column(draw: ImageDraw.ImageDraw, stop_name: str, routes: List[Tuple[str, List[int]]], col_w: int, x0: int, top_y: int = TOP_Y) -> None:
+def draw_column_chrome(draw: ImageDraw.ImageDraw, n_rows: int, col_w: int, x0: int, top_y: int = TOP_Y) -> None:
+    """Draw the static shapes of a stop column: the title pill and up to 2 route badges."""
+    if n_rows <= 0:
+        return
+
+    # Stop-name pill
+    pill_w = min(col_w - 12, PILL_MAX_W)
+    pill_x = x0 + (col_w - pill_w) // 2
+    draw.rounded_rectangle((pill_x, top_y, pill_x + pill_w, top_y + PILL_H), radius=12, fill=0)
+
+    # circular route badges
+    y = top_y + PILL_H + 48
+    d_half = BADGE_D // 2
+    cx = x0 + 8 + d_half
+    _ellipse = draw.ellipse
+    for _ in range(min(n_rows, 2)):
+        cy = y + d_half
+        _ellipse((cx - d_half, cy - d_half, cx + d_half, cy + d_half), fill=0)
+        y += ROW_ADVANCE
+
+
+def render_stop_column(draw: ImageDraw.ImageDraw, stop_name: str, routes: List[Tuple[str, List[int]]], col_w: int, x0: int, top_y: int = TOP_Y, *, chrome: bool = True) -> None:
+    """Draw one stop column. Pass chrome=False when the pill/badges are already on the canvas."""
     if not routes:
         return  # nothing to draw for this stop
 
+    if chrome:
+        draw_column_chrome(draw, len(routes), col_w, x0, top_y)
+
     # Stop-name pill
     pill_h = PILL_H
     pill_w = min(col_w - 12, PILL_MAX_W)
     pill_x = x0 + (col_w - pill_w) // 2
     pill_y = top_y
-    title_font = _load_font(FONT_DIR, 22)
-
-    # draw pill
-    draw.rounded_rectangle((pill_x, pill_y, pill_x + pill_w, pill_y + pill_h), radius=12, fill=0)
 
     # center of pill
     cx = pill_x + pill_w // 2
     cy = pill_y + pill_h // 2
-    draw_centered_text(draw, cx, cy, stop_name, title_font, fill=255, nudge_x=PILL_TEXT_NUDGE_X, nudge_y=PILL_TEXT_NUDGE_Y)
+    draw_centered_text(draw, cx, cy, stop_name, _TITLE_FONT, fill=255, nudge_x=PILL_TEXT_NUDGE_X, nudge_y=PILL_TEXT_NUDGE_Y)
 
     # route rows
     y = top_y + pill_h + 48
-    badge_font = _load_font_bold(FONT_DIR, 24)
-    eta_big = _load_font_bold(FONT_DIR, 32)
-    eta_small = _load_font_mono(FONT_DIR, 24)
+
+    # loop-invariant geometry and bound draw methods
+    d_half = BADGE_D // 2
+    cx = x0 + 8 + d_half
+    text_x = x0 + 8 + BADGE_D + ETA_GAP_FROM_BADGE
+    _text = draw.text
+    _tbb = draw.textbbox
 
     for svc, etas in routes[:2]:  # only draw up to 2 actual services
-        # circular route badge
-        d = BADGE_D
-        cx = x0 + 8 + d // 2
-        cy = y + d // 2
-        draw.ellipse((cx - d // 2, cy - d // 2, cx + d // 2, cy + d // 2), fill=0)
+        # route badge text
+        cy = y + d_half
 
-        rb = draw.textbbox((0, 0), svc, font=badge_font)
+        rb = _tbb((0, 0), svc, font=_BADGE_FONT)
         text_w = rb[2] - rb[0]
         text_h = rb[3] - rb[1]
-        draw.text((cx - text_w / 2 + BADGE_TEXT_NUDGE_X, cy - text_h / 2 + BADGE_TEXT_NUDGE_Y), svc, font=badge_font, fill=255)
-
-        text_x = x0 + 8 + d + ETA_GAP_FROM_BADGE
+        _text((cx - text_w / 2 + BADGE_TEXT_NUDGE_X, cy - text_h / 2 + BADGE_TEXT_NUDGE_Y), svc, font=_BADGE_FONT, fill=255)
 
         # Format ETAs (l2/l3 zero-padded)
         l1, l2, l3 = fmt_all_etas(etas)
 
         # draw l1 (main ETA)
         y_l1 = y + L1_NUDGE_Y
-        draw.text((text_x + L1_NUDGE_X, y_l1), l1, font=eta_big, fill=0)
+        _text((text_x + L1_NUDGE_X, y_l1), l1, font=_ETA_BIG, fill=0)
 
         # l2 / l3
         if l2 != "—":
-            draw.text((text_x + L2_L3_NUDGE_X, y_l1 + L2_NUDGE_Y), l2, font=eta_small, fill=0)
+            _text((text_x + L2_L3_NUDGE_X, y_l1 + L2_NUDGE_Y), l2, font=_ETA_SMALL, fill=0)
         if l3 != "—":
-            draw.text((text_x + L2_L3_NUDGE_X, y_l1 + L3_NUDGE_Y), l3, font=eta_small, fill=0)
+            _text((text_x + L2_L3_NUDGE_X, y_l1 + L3_NUDGE_Y), l3, font=_ETA_SMALL, fill=0)
 
         y += ROW_ADVANCE
 
@@ -195,19 +214,38 @@ class StopPayload(TypedDict):
     routes: List[Tuple[str, List[int]]]
 
 
+def _column_width(width: int) -> int:
+    return (width - 2 * COL_MARGIN - 2 * COL_GAP) // 3
+
+
+@lru_cache(maxsize=32)
+def _chrome_template(width: int, height: int, rows_per_col: Tuple[int, ...]) -> Image.Image:
+    """Blank screen with every column's pill and badges drawn; copy() before drawing on it.
+
+    Keyed by the badge count per column (0-2), so there are at most 27 variants.
+    """
+    img = Image.new("1", (width, height), 255)
+    draw = ImageDraw.Draw(img)
+    col_w = _column_width(width)
+    for i, n_rows in enumerate(rows_per_col):
+        x0 = COL_MARGIN + i * (col_w + COL_GAP)
+        draw_column_chrome(draw, n_rows, col_w, x0, top_y=TOP_Y)
+    return img
+
+
 def render_bus_screen(epd, stops_payload: List[StopPayload]) -> Image.Image:
     """Build a 1-bit image using three stop columns."""
-    img = Image.new("1", (epd.width, epd.height), 255)
-    draw = ImageDraw.Draw(img)
+    stops = [stops_payload[i] if i < len(stops_payload) else {"name": "—", "routes": []} for i in range(3)]
 
-    # background
-    # draw.rectangle((0, 0, epd.width, epd.height), fill=255)
+    # Static shapes come from a cached template; only text is drawn per frame
+    rows_per_col = tuple(min(len(stop.get("routes", [])), 2) for stop in stops)
+    img = _chrome_template(epd.width, epd.height, rows_per_col).copy()
+    draw = ImageDraw.Draw(img)
 
-    col_w = (epd.width - 2 * COL_MARGIN - 2 * COL_GAP) // 3
-    for i in range(3):
+    col_w = _column_width(epd.width)
+    for i, stop in enumerate(stops):
         x0 = COL_MARGIN + i * (col_w + COL_GAP)
-        stop = stops_payload[i] if i < len(stops_payload) else {"name": "—", "routes": []}
-        render_stop_column(draw, stop.get("name", "—"), stop.get("routes", []), col_w, x0, top_y=TOP_Y)
+        render_stop_column(draw, stop.get("name", "—"), stop.get("routes", []), col_w, x0, top_y=TOP_Y, chrome=False)
     return img
 
 
@@ -216,44 +254,61 @@ _session = requests.Session()
 _session.mount(
     "https://",
     HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=4,
         max_retries=Retry(
             total=3,
             backoff_factor=0.3,
             status_forcelist=(429, 500, 502, 503, 504),
             allowed_methods=("GET",),
-        )
+            respect_retry_after_header=True,
+        ),
     ),
 )
+# Static headers live on the session so each request only merges the API key
+_session.headers.update(
+    {
+        "accept": "application/json",
+        "Connection": "keep-alive",
+        "Keep-Alive": "timeout=120, max=1000",
+    }
+)
 
+# (connect, read) — keep stalls short so the e-paper loop keeps moving
+HTTP_TIMEOUT = (3, 8)
 
-def get_bus_arrival(bus_stop_code: str) -> List[Tuple[str, List[int]]]:
+
+def prewarm() -> None:
+    """Open a pooled connection to API_URL so the first arrival fetch skips the TLS handshake."""
+    api_url = os.getenv("API_URL", "").rstrip("/")
+    if not api_url:
+        return
+    try:
+        _session.head(api_url, timeout=HTTP_TIMEOUT)
+    except requests.RequestException as e:
+        logging.debug("[prewarm] %s", e)
+
+
+def _api_config() -> Optional[Tuple[str, Dict[str, str]]]:
+    """Return (api_url, headers) from the environment, or None if not configured."""
     api_key = os.getenv("API_KEY")
     if not api_key:
         logging.error("Missing API_KEY")
-        return []
+        return None
 
     api_url = os.getenv("API_URL", "").rstrip("/")
     if not api_url:
         logging.error("Missing API_URL")
-        return []
+        return None
 
-    url = f"{api_url}/busarrival?BusStopCode={bus_stop_code}"
-    headers = {"x-api-key": api_key, "accept": "application/json"}
+    return api_url, {"x-api-key": api_key}
 
-    try:
-        r = _session.get(url, headers=headers, timeout=8)
-        r.raise_for_status()
-        data = r.json()
-    except requests.RequestException as e:
-        logging.error(f"[get_bus_arrival] Network/API error: {e}")
-        return []
-    except ValueError:
-        logging.error("[get_bus_arrival] Invalid JSON")
-        return []
 
-    services = data.get("Services", [])
-    now = datetime.now(ASIA_SG)
-    out: List[Tuple[str, List[Optional[int]]]] = []
+def _parse_services(services: List[dict]) -> List[Tuple[str, List[int]]]:
+    """Turn a stop's "Services" list into (service_no, [mins...]) sorted by next arrival."""
+    # Round now up: ETAs are whole seconds, so the // 60 below equals floor((eta - now) / 60)
+    now_ts = math.ceil(datetime.now(ASIA_SG).timestamp())
+    out: List[Tuple[str, List[int]]] = []
 
     for svc in services:
         svc_no = svc.get("ServiceNo", "?")
@@ -265,24 +320,137 @@ def get_bus_arrival(bus_stop_code: str) -> List[Tuple[str, List[int]]]:
                 etas.append(None)
                 continue
             try:
-                eta_dt = datetime.strptime(eta, "%Y-%m-%dT%H:%M:%S%z")
-                diff_min = (eta_dt - now).total_seconds() / 60.0
-                etas.append(_clamp_minutes_floor(diff_min))
-            except Exception:
+                # fromisoformat is C-implemented and accepts offsets/"Z" on 3.11+
+                eta_dt = datetime.fromisoformat(eta)
+            except (TypeError, ValueError):
+                etas.append(None)
+                continue
+            if eta_dt.tzinfo is None:
+                # no offset: .timestamp() would read it as the Pi's local time
                 etas.append(None)
+                continue
+            eta_ts = int(eta_dt.timestamp())
+            # whole minutes until arrival, floored; late buses read as 0
+            etas.append(max(0, (eta_ts - now_ts) // 60))
 
-        clean = [e for e in etas if e is not None]
+        clean: List[int] = [e for e in etas if e is not None]
         if clean:
             # keep only first three values (already)
             out.append((svc_no, clean[:3]))
 
     out.sort(key=lambda t: (t[1][0] if t[1] else 9999))
-    # Type: List[Tuple[str, List[int]]] – cast by filtering None above
-    return [(svc, list(map(int, mins))) for svc, mins in out]  # type: ignore[return-value]
+    return out
+
+
+def get_bus_arrival(bus_stop_code: str) -> List[Tuple[str, List[int]]]:
+    cfg = _api_config()
+    if cfg is None:
+        return []
+    api_url, headers = cfg
+
+    url = f"{api_url}/busarrival?BusStopCode={bus_stop_code}"
+
+    try:
+        r = _session.get(url, headers=headers, timeout=HTTP_TIMEOUT)
+        r.raise_for_status()
+        data = r.json()
+    except requests.RequestException as e:
+        logging.error("[get_bus_arrival] Network/API error: %s", e)
+        return []
+    except ValueError:
+        logging.error("[get_bus_arrival] Invalid JSON")
+        return []
+
+    return _parse_services(data.get("Services", []))
+
+
+# Flipped off the first time the gateway gives anything but a valid batch response
+_batch_supported = True
+
+
+def _batch_unsupported(reason: str) -> None:
+    global _batch_supported
+    logging.info("[get_bus_arrivals_batch] %s — using per-stop requests", reason)
+    _batch_supported = False
+
+
+def get_bus_arrivals_batch(codes: List[str]) -> Optional[Dict[str, List[Tuple[str, List[int]]]]]:
+    """Fetch several stops in one request via /busarrival?BusStopCodes=A,B,C.
+
+    Expects a {"<code>": {"Services": [...]}, ...} response. A clear "not supported"
+    answer (4xx, non-JSON or non-batch body) returns None and disables batching so
+    callers fall back to get_bus_arrival. Transient failures (network, timeout, 5xx,
+    exhausted retries) return {} for this loop only, without a second round of requests.
+    """
+    cfg = _api_config()
+    if cfg is None:
+        return {}
+    api_url, headers = cfg
+
+    url = f"{api_url}/busarrival?BusStopCodes={','.join(codes)}"
+
+    try:
+        r = _session.get(url, headers=headers, timeout=HTTP_TIMEOUT)
+        r.raise_for_status()
+        data = r.json()
+    except requests.HTTPError as e:
+        status = e.response.status_code if e.response is not None else None
+        if status is not None and 400 <= status < 500 and status != 429:
+            _batch_unsupported(f"Batch request rejected ({status})")
+            return None
+        logging.error("[get_bus_arrivals_batch] Network/API error: %s", e)
+        return {}
+    except requests.RequestException as e:
+        logging.error("[get_bus_arrivals_batch] Network/API error: %s", e)
+        return {}
+    except ValueError:
+        _batch_unsupported("Batch response is not JSON")
+        return None
+
+    # A gateway without batching answers with a single-stop body (or something else entirely)
+    if not isinstance(data, dict) or "Services" in data or not any(code in data for code in codes):
+        _batch_unsupported("Batch endpoint not available")
+        return None
+
+    out: Dict[str, List[Tuple[str, List[int]]]] = {}
+    for code in codes:
+        entry = data.get(code)
+        services = entry.get("Services") if isinstance(entry, dict) else None
+        out[code] = _parse_services(services) if isinstance(services, list) else []
+    return out
+
+
+def _fetch_routes(codes: Tuple[Optional[str], ...]) -> List[List[Tuple[str, List[int]]]]:
+    """Routes for each code (empty list for missing codes), batched when the gateway allows."""
+    wanted = [code for code in codes if code]
+
+    if _batch_supported:
+        by_code = get_bus_arrivals_batch(wanted)
+        if by_code is not None:
+            return [by_code.get(code, []) if code else [] for code in codes]
+
+    # Fetch all stops concurrently; each call is a blocking HTTPS round-trip
+    routes: List[List[Tuple[str, List[int]]]] = [[] for _ in codes]
+    with ThreadPoolExecutor(max_workers=len(codes)) as pool:
+        futures = {pool.submit(get_bus_arrival, code): i for i, code in enumerate(codes) if code}
+        for fut in as_completed(futures):
+            routes[futures[fut]] = fut.result()
+    return routes
 
 
 # ---------- main entry ----------
+# Last rendered screen, keyed by the ETA payload it was built from
+_last_key: Optional[tuple] = None
+_last_img: Optional[Image.Image] = None
+
+
+def _payload_key(stops_payload: List[StopPayload]) -> tuple:
+    return tuple((s["name"], tuple((svc, tuple(mins)) for svc, mins in s["routes"])) for s in stops_payload)
+
+
 def show_bus_arrivals(epd) -> None:
+    global _last_key, _last_img
+
     # names
     name_a = os.getenv("STOP_NAME_A", "Stop A")
     name_b = os.getenv("STOP_NAME_B", "Stop B")
@@ -296,9 +464,7 @@ def show_bus_arrivals(epd) -> None:
         logging.error("Missing STOP_CODE_A/B/C")
         return
 
-    route_a = get_bus_arrival(code_a) if code_a else []
-    route_b = get_bus_arrival(code_b) if code_b else []
-    route_c = get_bus_arrival(code_c) if code_c else []
+    route_a, route_b, route_c = _fetch_routes((code_a, code_b, code_c))
 
     # If everything is empty, skip the EPD update to avoid unnecessary refresh
     if not (route_a or route_b or route_c):
@@ -311,7 +477,17 @@ def show_bus_arrivals(epd) -> None:
         {"name": name_c, "routes": route_c},
     ]
 
-    logging.debug("Stops payload: %s", stops_payload)
+    # logging.debug already defers the repr; the guard only skips the call itself
+    if logging.getLogger().isEnabledFor(logging.DEBUG):
+        logging.debug("Stops payload: %s", stops_payload)
 
-    img = render_bus_screen(epd, stops_payload)
-    epd.display(epd.getbuffer(img))
+    # Reuse the previous render when nothing changed. The panel is still refreshed
+    # because image frames are shown in between; the EPD proxy skips identical buffers.
+    key = _payload_key(stops_payload)
+    if key == _last_key and _last_img is not None:
+        logging.debug("Bus payload unchanged — reusing last render")
+        img = _last_img
+    else:
+        img = render_bus_screen(epd, stops_payload)
+        _last_key, _last_img = key, img
+    epd.display_image(img)
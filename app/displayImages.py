@@ -1,9 +1,11 @@
-# displayImages.py — simplified (no cache, no preprocessing)
+# displayImages.py — simplified (packed-buffer cache, no preprocessing)
 import os
 import sys
 import time
 import logging
-import glob
+import fnmatch
+import re
+from collections import OrderedDict
 from typing import List, Optional
 from PIL import Image
 
@@ -12,12 +14,20 @@ FRAME_SUB_PATH = os.getenv("FRAME_SUB_PATH", "base")
 FRAME_PATTERN = os.getenv("FRAME_PATTERN", "frame_*.bmp")
 FRAME_ZPAD = int(os.getenv("FRAME_ZPAD", "2"))  # zero-pad width for {n}, e.g., 2 => frame01.bmp
 IMAGE_REFRESH_SECONDS = float(os.getenv("IMAGE_REFRESH_SECONDS", "5"))
+FRAME_CACHE_MAX = int(os.getenv("FRAME_CACHE_MAX", "64"))  # packed buffers kept in RAM (~48KB each at 800x480)
 
 # Base dirs
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
 PIC_DIR = os.path.join(BASE_DIR, "images")
 FRAMES_DIR = os.path.join(BASE_DIR, "images", "frames", FRAME_SUB_PATH)
 
+SLEEP_PATH = os.path.join(PIC_DIR, "sleep.bmp")
+
+# Frame-name matchers, compiled once
+_FRAME_IS_GLOB = any(t in FRAME_PATTERN for t in "*?[")
+_FRAME_RE = re.compile(fnmatch.translate(FRAME_PATTERN))
+_BMP_RE = re.compile(fnmatch.translate("*.bmp"))
+
 
 # ---------------- Image utils ----------------
 def _fmt_frame_name(n: int) -> str:
@@ -27,6 +37,21 @@ def _fmt_frame_name(n: int) -> str:
     return FRAME_PATTERN.format(n=n)
 
 
+def _scan_frames(pattern: "re.Pattern[str]", include_hidden: bool = False) -> List[str]:
+    """Sorted paths of regular files in FRAMES_DIR whose name matches pattern.
+
+    Like glob, dotfiles (e.g. macOS "._frame.bmp" AppleDouble files) are skipped
+    unless include_hidden is set, and an unreadable/missing directory yields [].
+    """
+    try:
+        with os.scandir(FRAMES_DIR) as it:
+            # DirEntry.is_file() uses cached dirent info — no extra stat per file
+            names = [e.name for e in it if (include_hidden or not e.name.startswith(".")) and e.is_file() and pattern.match(e.name)]
+    except OSError:
+        return []
+    return [os.path.join(FRAMES_DIR, n) for n in sorted(names)]
+
+
 def _sorted_frame_paths() -> List[str]:
     """
     Auto-discover frames from FRAMES_DIR:
@@ -35,9 +60,8 @@ def _sorted_frame_paths() -> List[str]:
     - Else fall back to all .bmp files.
     """
     # Use glob pattern directly if provided
-    if any(t in FRAME_PATTERN for t in ("*", "?", "[")):
-        paths = sorted(glob.glob(os.path.join(FRAMES_DIR, FRAME_PATTERN)))
-        return [p for p in paths if os.path.isfile(p)]
+    if _FRAME_IS_GLOB:
+        return _scan_frames(_FRAME_RE, include_hidden=FRAME_PATTERN.startswith("."))
 
     # Optional explicit count
     try:
@@ -49,19 +73,21 @@ def _sorted_frame_paths() -> List[str]:
         return [os.path.join(FRAMES_DIR, _fmt_frame_name(i)) for i in range(1, count + 1)]
 
     # Last resort: all BMPs in FRAMES_DIR (alphabetical)
-    return sorted(glob.glob(os.path.join(FRAMES_DIR, "*.bmp")))
+    return _scan_frames(_BMP_RE)
 
 
 # ---------------- Sequencer ----------------
 class ImageSequencer:
     """
     Handles frame discovery, in-memory index, and showing frames.
-    No caching; assumes frames are already 800x480 1-bit BMPs.
+    Packed display buffers are cached per path (LRU, FRAME_CACHE_MAX entries);
+    assumes frames are already 800x480 1-bit BMPs.
     """
 
     def __init__(self):
         self._paths: List[str] = _sorted_frame_paths()
         self._index: int = 0  # 0-based
+        self._buffers: "OrderedDict[str, bytearray]" = OrderedDict()
         if self._paths:
             logging.debug(
                 "ImageSequencer: found %d frames (%s ... %s)",
@@ -75,6 +101,7 @@ class ImageSequencer:
     def reload(self):
         """Re-scan the images directory and keep index within bounds."""
         self._paths = _sorted_frame_paths()
+        self._buffers.clear()  # files may have been replaced on disk
         if self._paths:
             self._index %= len(self._paths)
         else:
@@ -93,6 +120,20 @@ class ImageSequencer:
             return
         self._index = (self._index + 1) % len(self._paths)
 
+    def _buffer_for(self, path: str, epd):
+        """Return the packed display buffer for path, decoding it on first use."""
+        buf = self._buffers.get(path)
+        if buf is not None:
+            self._buffers.move_to_end(path)
+            return buf
+        with Image.open(path) as img:
+            buf = epd.getbuffer(img)
+        if FRAME_CACHE_MAX > 0:
+            self._buffers[path] = buf
+            if len(self._buffers) > FRAME_CACHE_MAX:
+                self._buffers.popitem(last=False)
+        return buf
+
     def show_next(self, epd) -> bool:
         """Show current frame then advance; sleep between frames."""
         if not self._paths:
@@ -106,11 +147,10 @@ class ImageSequencer:
             return False
 
         try:
-            # Files are preprocessed to correct size/mode — just open and display
-            with Image.open(path) as img:
-                epd.display(epd.getbuffer(img))
+            # Files are preprocessed to correct size/mode — display the cached buffer
+            epd.display(self._buffer_for(path, epd))
         except Exception as e:
-            logging.error(f"EPD display error for {path}: {e}")
+            logging.error("EPD display error for %s: %s", path, e)
             # Skip this frame to prevent stalls
             self.advance()
             time.sleep(IMAGE_REFRESH_SECONDS)
@@ -142,7 +182,7 @@ def show_image(epd, img_path: str):
         return False
     try:
         with Image.open(img_path) as img:
-            epd.display(epd.getbuffer(img))
+            epd.display_image(img)
         return True
     except Exception as e:
         logging.error("EPD display error for %s: %s", img_path, e)
@@ -159,9 +199,27 @@ def show_image_loop(epd):
     return _SEQUENCER.show_next(epd)
 
 
+# sleep.bmp is static: decode once at import, pack on first use
+try:
+    with Image.open(SLEEP_PATH) as _img:
+        _SLEEP_IMG: Optional[Image.Image] = _img.convert("1")
+except OSError:
+    _SLEEP_IMG = None
+_SLEEP_BUF = None
+
+
 def show_sleep(epd):
     """
     Draw sleep.bmp from images/, put panel to sleep, then wait.
     """
-    path = os.path.join(PIC_DIR, "sleep.bmp")
-    return show_image(epd, path)
+    global _SLEEP_BUF
+    if _SLEEP_IMG is None:
+        return show_image(epd, SLEEP_PATH)
+    try:
+        if _SLEEP_BUF is None:
+            _SLEEP_BUF = epd.getbuffer(_SLEEP_IMG)
+        epd.display(_SLEEP_BUF)
+        return True
+    except Exception as e:
+        logging.error("EPD display error for %s: %s", SLEEP_PATH, e)
+        return False
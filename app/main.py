@@ -1,11 +1,14 @@
 # main.py
+import hashlib
 import logging
 import os
 import signal
 import sys
+import threading
 import time
+from collections import OrderedDict
 from datetime import datetime
-from typing import Any
+from typing import Any, Tuple
 from zoneinfo import ZoneInfo
 
 from dotenv import load_dotenv
@@ -21,6 +24,7 @@ ASIA_SG = ZoneInfo("Asia/Singapore")
 # --- Partial refresh configuration ---
 PARTIAL_ENABLE = os.getenv("PARTIAL_ENABLE", "1") not in ("0", "false", "False")
 PARTIAL_FULL_EVERY_N = int(os.getenv("PARTIAL_FULL_EVERY_N", "10"))  # full refresh every N display() calls
+BUF_CACHE_MAX = int(os.getenv("BUF_CACHE_MAX", "8"))  # packed buffers kept by display_image()
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
 LIB_DIR = os.path.join(BASE_DIR, "libraries")
@@ -41,6 +45,9 @@ class EpdPartialProxy:
       - First frame after init/clear -> full refresh, then set partial base if supported
       - Subsequent frames -> displayPartial()
       - Every N frames -> full refresh to clear ghosting
+      - A buffer identical to the last one sent since init/clear is skipped
+
+    display_image(img) packs via getbuffer() with a small content-keyed cache.
     """
 
     def __init__(self, epd: Any, full_every_n: int = 20, enabled: bool = True):
@@ -49,17 +56,21 @@ class EpdPartialProxy:
         self._full_every_n = max(0, int(full_every_n))
         self._call_count = 0
         self._base_set = False
+        self._last_digest = None
+        self._buf_cache: "OrderedDict[Tuple[str, Tuple[int, int], bytes], Any]" = OrderedDict()
 
     # ---- lifecycle pass-throughs that also reset base ----
     def init(self, *args, **kwargs):
         rv = self._epd.init(*args, **kwargs)
         self._base_set = False
         self._call_count = 0
+        self._last_digest = None
         return rv
 
     def Clear(self):
         self._base_set = False
         self._call_count = 0
+        self._last_digest = None
         return self._epd.Clear()
 
     def sleep(self):
@@ -68,11 +79,42 @@ class EpdPartialProxy:
     def getbuffer(self, *args, **kwargs):
         return self._epd.getbuffer(*args, **kwargs)
 
+    def _cached_buffer(self, img):
+        # Key on the full pixel data: tobytes() and blake2b run in C, while the
+        # driver's getbuffer() inverts every byte in a Python loop.
+        key = (img.mode, img.size, hashlib.blake2b(img.tobytes(), digest_size=16).digest())
+        buf = self._buf_cache.get(key)
+        if buf is not None:
+            self._buf_cache.move_to_end(key)
+            return buf
+        buf = self._epd.getbuffer(img)
+        if BUF_CACHE_MAX > 0:
+            self._buf_cache[key] = buf
+            if len(self._buf_cache) > BUF_CACHE_MAX:
+                self._buf_cache.popitem(last=False)
+        return buf
+
+    def display_image(self, img):
+        return self.display(self._cached_buffer(img))
+
     # ---- display interception ----
+    @staticmethod
+    def _digest(buf) -> bytes:
+        # getbuffer() returns a list for wrong-sized images; blake2b needs bytes-like
+        data = buf if isinstance(buf, (bytes, bytearray)) else bytes(buf)
+        return hashlib.blake2b(data, digest_size=16).digest()
+
     def display(self, buf):
         if not self._enabled:
             return self._epd.display(buf)
 
+        # Same buffer already on the panel: leave the SPI bus alone
+        digest = self._digest(buf)
+        if self._base_set and digest == self._last_digest:
+            logging.debug("Buffer unchanged — skipping refresh")
+            return None
+        self._last_digest = digest
+
         # First frame after init/clear: full refresh; try to prime partial base
         if not self._base_set:
             out = self._epd.display(buf)
@@ -126,11 +168,15 @@ print("=== Application starting ===")
 logging.info("Logging initialized")
 
 _shutdown = False
+_shutdown_evt = threading.Event()
 
 
 def _handle_term(signum, frame):
     global _shutdown
     _shutdown = True
+    # The handler runs on the main thread, possibly while it holds the Event's
+    # internal lock inside wait(); setting it from here could self-deadlock.
+    threading.Thread(target=_shutdown_evt.set, daemon=True).start()
 
 
 signal.signal(signal.SIGTERM, _handle_term)
@@ -148,12 +194,8 @@ def is_sleep_hours(now: datetime) -> bool:
 
 
 def _wait_with_sigterm(seconds: float):
-    """Sleep up to 'seconds' but wake quickly on SIGTERM."""
-    waited = 0.0
-    step = 0.5
-    while waited < seconds and not _shutdown:
-        time.sleep(min(step, seconds - waited))
-        waited += step
+    """Sleep up to 'seconds'; SIGTERM wakes it via a helper thread that sets the event."""
+    _shutdown_evt.wait(timeout=seconds)
 
 
 def main():
@@ -169,6 +211,9 @@ def main():
         enabled=PARTIAL_ENABLE,
     )
 
+    # Open the API connection pool up front so the first bus refresh skips the handshake
+    displayBuses.prewarm()
+
     loop_i = 0
 
     try:
@@ -4,7 +4,7 @@ import os
 import sys
 
 CHECK_INTERVAL = 60  # seconds
-MAIN_SCRIPT = ['python', 'app/main.py']  # Use `sys.executable` if using venv
+MAIN_SCRIPT = [sys.executable, 'app/main.py']  # same interpreter as the watcher (works in venvs)
 
 def run_main():
     """Start main.py as a subprocess."""
@@ -15,9 +15,11 @@ def get_current_commit(ref='HEAD'):
     result = subprocess.run(['git', 'rev-parse', ref], stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
     return result.stdout.strip() if result.returncode == 0 else None
 
-def fetch_remote():
-    """Fetch latest commits from remote."""
-    subprocess.run(['git', 'fetch'], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+def get_remote_commit(branch='main'):
+    """Get the remote branch's commit hash with a single ls-remote round-trip (no object download)."""
+    result = subprocess.run(['git', 'ls-remote', 'origin', f'refs/heads/{branch}'], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    fields = result.stdout.split()
+    return fields[0] if result.returncode == 0 and fields else None
 
 def pull_changes():
     """Pull changes from remote."""
@@ -29,8 +31,7 @@ def watcher_loop():
 
     while True:
         time.sleep(CHECK_INTERVAL)
-        fetch_remote()
-        remote_commit = get_current_commit('origin/main')
+        remote_commit = get_remote_commit('main')
 
         if remote_commit and remote_commit != local_commit:
             print("Change detected on remote. Pulling and restarting main.py...")